@@ -1,37 +1,51 @@
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from dotenv import load_dotenv
 
+from daily_client import BASE_URL, auth_headers, post_json
+from fastjson import load_file
+
 load_dotenv(override=True)
 
 DAILY_TARGET_API_KEY = os.getenv("DAILY_TARGET_API_KEY")
-BASE_URL = "https://api.daily.co/v1"
+MAX_WORKERS = 16
 
 if not DAILY_TARGET_API_KEY:
     raise ValueError("❌ DAILY_TARGET_API_KEY is not set. Check your .env file.")
 
+VERIFIED_CALLER_IDS_URL = f"{BASE_URL}/verified-caller-ids"
+TARGET_HEADERS = auth_headers(DAILY_TARGET_API_KEY)
+
 
 def add_unverified_caller_ids():
-    with open("unverified_caller_ids.json", "r") as f:
-        caller_ids = json.load(f)
-    headers = {"Authorization": f"Bearer {DAILY_TARGET_API_KEY}"}
-    for entry in caller_ids:
-        number = entry.get("number")
-        name = entry.get("name", "")
-        payload = {"number": number, "name": name}
-        response = requests.post(
-            f"{BASE_URL}/verified-caller-ids",
-            headers={**headers, "Content-Type": "application/json"},
-            json=payload,
-        )
-        if response.status_code == 200:
-            print(f"✅ Added {number} ({name})")
-        else:
-            print(f"❌ Failed to add {number} ({name})")
-            print("Status Code:", response.status_code)
-            print("Response:", response.text)
+    caller_ids = load_file("unverified_caller_ids.json")
+
+    def post_one(entry):
+        payload = {"number": entry.get("number"), "name": entry.get("name", "")}
+        try:
+            response = post_json(VERIFIED_CALLER_IDS_URL, payload, headers=TARGET_HEADERS)
+        except requests.RequestException as e:
+            # Report it with the other results instead of aborting the whole batch
+            return entry, None, str(e)
+        # The body is only reported on failure, so don't decode it otherwise
+        text = response.text if response.status_code != 200 else None
+        return entry, response.status_code, text
+
+    # Workers only do the HTTP call; printing stays on this thread
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        for entry, status_code, text in ex.map(post_one, caller_ids):
+            number = entry.get("number")
+            name = entry.get("name", "")
+            if status_code == 200:
+                print(f"✅ Added {number} ({name})")
+            elif status_code is None:
+                print(f"❌ Failed to add {number} ({name}): {text}")
+            else:
+                print(f"❌ Failed to add {number} ({name})")
+                print("Status Code:", status_code)
+                print("Response:", text)
 
 
 if __name__ == "__main__":
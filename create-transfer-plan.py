@@ -1,36 +1,23 @@
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 from dotenv import load_dotenv
 
+from daily_client import check_api_identities, fetch_domain_dialin, fetch_purchased
+from fastjson import dump_file, dumps, loads
+
 load_dotenv(override=True)
 
 DAILY_SOURCE_API_KEY = os.getenv("DAILY_SOURCE_API_KEY")
 DAILY_TARGET_API_KEY = os.getenv("DAILY_TARGET_API_KEY")
-BASE_URL = "https://api.daily.co/v1"
 
 if not DAILY_SOURCE_API_KEY or not DAILY_TARGET_API_KEY:
     raise ValueError(
         "❌ DAILY_SOURCE_API_KEY or DAILY_TARGET_API_KEY is not set. Check your .env file."
     )
 
-
-def check_api_identity(label, token):
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    response = requests.get(BASE_URL + "/", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"\n🔑 {label} domain: {data.get('domain_name')} (id: {data.get('domain_id')})")
-    else:
-        print(f"❌ Failed to verify {label} API token.")
-        print("Status Code:", response.status_code)
-        print("Response:", response.text)
-
-
 def get_purchased_phone_numbers():
-    headers = {"Authorization": f"Bearer {DAILY_SOURCE_API_KEY}"}
-    response = requests.get(f"{BASE_URL}/purchased-phone-numbers", headers=headers)
+    response = fetch_purchased(DAILY_SOURCE_API_KEY)
 
     if response.status_code != 200:
         print("Failed to fetch purchased phone numbers.")
@@ -38,15 +25,19 @@ def get_purchased_phone_numbers():
         print("Response:", response.text)
         return []
 
-    data = response.json()
+    data = loads(response.content)
     numbers = data.get("data", [])
     return numbers
 
 
 def print_numbers(numbers):
-    print("\n📞 Purchased Phone Numbers:")
-    for idx, num in enumerate(numbers):
-        print(f"[{idx}] {num['number']} — ID: {num['id']} — Name: {num['name']}")
+    print(
+        "\n📞 Purchased Phone Numbers:\n"
+        + "\n".join(
+            f"[{idx}] {num['number']} — ID: {num['id']} — Name: {num['name']}"
+            for idx, num in enumerate(numbers)
+        )
+    )
 
 
 # Prompt user to select numbers for transfer
@@ -54,7 +45,8 @@ def prompt_user_selection(numbers):
     while True:
         choice = input("\nDo you want to transfer all numbers? (y/n): ").strip().lower()
         if choice == "y":
-            return numbers
+            # Consumed once by build_transfer_plan, no need for another list
+            return iter(numbers)
         elif choice == "n":
             indices = input("Enter comma-separated list of indexes to transfer (e.g. 0,2): ")
             try:
@@ -70,16 +62,17 @@ def prompt_user_selection(numbers):
             print("Please enter 'y' or 'n'.")
 
 
-# Fetch configs from both root and domain-dialin-config endpoints
-def get_dialin_configs():
-    headers = {"Authorization": f"Bearer {DAILY_SOURCE_API_KEY}"}
+def print_configs(title, configs):
+    # Format the whole section up front and write it in one go
+    print("\n".join([title] + [dumps(cfg, indent=True).decode() for cfg in configs]))
+
 
-    # Fetch from root config
-    root_resp = requests.get(f"{BASE_URL}/", headers=headers)
+# Collect configs from the already fetched root config and domain-dialin-config responses
+def get_dialin_configs(root_data, dialin_resp):
+    # Legacy configs live on the root config
     root_pinless_configs = []
     root_pin_configs = []
-    if root_resp.status_code == 200:
-        root_data = root_resp.json()
+    if root_data is not None:
         root_pinless_configs = root_data.get("config", {}).get("pinless_dialin") or []
         root_pin_configs = root_data.get("config", {}).get("pin_dialin") or []
         print(
@@ -87,31 +80,24 @@ def get_dialin_configs():
         )
         print(f"✅ Found {len(root_pin_configs)} 'pin_dialin' configs in root domain config")
     else:
-        print("⚠️ Failed to fetch root domain config:", root_resp.text)
+        print("⚠️ Root domain config unavailable, skipping root dial-in configs.")
 
-    # Fetch from domain-dialin-config
-    dialin_resp = requests.get(f"{BASE_URL}/domain-dialin-config", headers=headers)
+    # Configs from domain-dialin-config
     dialin_configs = []
     if dialin_resp.status_code == 200:
-        dialin_data = dialin_resp.json()
+        dialin_data = loads(dialin_resp.content)
         dialin_configs = dialin_data.get("data", [])
         print(f"✅ Found {len(dialin_configs)} configs in domain-dialin-config")
     else:
         print("⚠️ Failed to fetch domain-dialin-config:", dialin_resp.text)
 
     if root_pinless_configs:
-        print("\n📎 Root pinless_dialin configs:")
-        for cfg in root_pinless_configs:
-            print(json.dumps(cfg, indent=2))
+        print_configs("\n📎 Root pinless_dialin configs:", root_pinless_configs)
     if root_pin_configs:
-        print("\n📎 Root pin_dialin configs:")
-        for cfg in root_pin_configs:
-            print(json.dumps(cfg, indent=2))
+        print_configs("\n📎 Root pin_dialin configs:", root_pin_configs)
 
     if dialin_configs:
-        print("\n📎 Domain-dialin-config entries:")
-        for cfg in dialin_configs:
-            print(json.dumps(cfg, indent=2))
+        print_configs("\n📎 Domain-dialin-config entries:", dialin_configs)
 
     return root_pinless_configs, root_pin_configs, dialin_configs
 
@@ -123,40 +109,44 @@ def build_transfer_plan(selected_numbers, root_pinless_configs, root_pin_configs
     for cfg in root_pinless_configs:
         key = cfg.get("phone_number") or cfg.get("sip_uri")
         if key:
+            cfg["type"] = "pinless_dialin"
             config_map[key] = {"src_type": "root-pinless", "config": cfg, "id": None}
-            config_map[key]["config"]["type"] = "pinless_dialin"
 
     for cfg in root_pin_configs:
         key = cfg.get("phone_number") or cfg.get("sip_uri")
         if key:
+            cfg["type"] = "pin_dialin"
             config_map[key] = {"src_type": "root-pin", "config": cfg, "id": None}
-            config_map[key]["config"]["type"] = "pin_dialin"
 
     for cfg in dialin_configs:
-        key = cfg.get("config", {}).get("phone_number") or cfg.get("config", {}).get("sip_uri")
+        config = cfg.get("config", {})
+        key = config.get("phone_number") or config.get("sip_uri")
         if key:
+            config["type"] = cfg.get("type")
             config_map[key] = {
                 "src_type": "domain-dialin-config",
-                "config": cfg["config"],
+                "config": config,
                 "id": cfg.get("id"),
             }
-            config_map[key]["config"]["type"] = cfg.get("type")
 
-    # 2. Create a set of valid phone numbers from selected numbers
-    valid_phone_numbers = {num["number"] for num in selected_numbers}
-    
-    # 3. Add selected numbers to plan
+    # 2. Add selected numbers to plan, collecting the set of valid phone numbers in the
+    # same pass so selected_numbers may be a one-shot iterator
+    valid_phone_numbers = set()
     plan = {}
     skipped = {}
-    orphaned_phone_configs = []
+    unverified_caller_ids = []  # skipped numbers in unverified_caller_ids.json format
+    get_config = config_map.get
 
     for num in selected_numbers:
         number = num["number"]
+        valid_phone_numbers.add(number)
         phone_id = num.get("id")
         if not phone_id:
-            skipped[number] = num.get("name", "")
+            name = num.get("name", "")
+            skipped[number] = name
+            unverified_caller_ids.append({"number": number, "name": name})
             continue
-        entry = config_map.get(number)
+        entry = get_config(number)
         plan[number] = {
             "source_phone_id": phone_id,
             "src_type": entry["src_type"] if entry else None,
@@ -164,22 +154,22 @@ def build_transfer_plan(selected_numbers, root_pinless_configs, root_pin_configs
             "config_data": entry["config"] if entry else None,
         }
 
-    # 4. Separate orphaned configs into two categories
-    orphaned_sip_configs = []  # Configs with sip_uri but no phone_number (can be transferred)
-    orphaned_phone_configs = []  # Configs with phone_number that doesn't exist (cannot be transferred)
-    
-    for key, entry in config_map.items():
-        if key not in plan:
-            config = entry["config"]
-            phone_number = config.get("phone_number")
-            
-            if phone_number:
-                # This is a config for a phone number that doesn't exist anymore
-                if phone_number not in valid_phone_numbers:
-                    orphaned_phone_configs.append((key, entry))
-            elif config.get("sip_uri"):
-                # This is a SIP-only config (no phone number)
-                orphaned_sip_configs.append((key, entry))
+    # 3. Separate orphaned configs into two categories
+    leftovers = [
+        (key, entry, entry["config"]) for key, entry in config_map.items() if key not in plan
+    ]
+    # Configs with phone_number that doesn't exist (cannot be transferred)
+    orphaned_phone_configs = [
+        (key, entry)
+        for key, entry, config in leftovers
+        if config.get("phone_number") and config["phone_number"] not in valid_phone_numbers
+    ]
+    # Configs with sip_uri but no phone_number (can be transferred)
+    orphaned_sip_configs = [
+        (key, entry)
+        for key, entry, config in leftovers
+        if not config.get("phone_number") and config.get("sip_uri")
+    ]
 
     # Handle orphaned configs for deleted phone numbers
     if orphaned_phone_configs:
@@ -198,8 +188,7 @@ def build_transfer_plan(selected_numbers, root_pinless_configs, root_pin_configs
                 "reason": "phone_number_not_found"
             }
         
-        with open("orphaned_phone_configs.json", "w") as f:
-            json.dump(orphaned_data, f, indent=2)
+        dump_file(orphaned_data, "orphaned_phone_configs.json")
 
     # Handle SIP-only configs
     if orphaned_sip_configs:
@@ -239,40 +228,36 @@ def build_transfer_plan(selected_numbers, root_pinless_configs, root_pin_configs
 
     if skipped:
         print("\n⏭️ Skipped Numbers (may need to be manually added to verified-caller-ids):")
-        print(json.dumps(skipped, indent=2))
+        print(dumps(skipped, indent=True).decode())
         print("\n💾 Writing skipped numbers to unverified_caller_ids.json...")
-        with open("unverified_caller_ids.json", "w") as f:
-            json.dump(
-                [{"number": number, "name": name} for number, name in skipped.items()],
-                f,
-                indent=2,
-            )
+        dump_file(unverified_caller_ids, "unverified_caller_ids.json")
 
     # Check for known invalid config values and prompt user for correction
     needs_correction = [
-        key
+        (key, entry["config_data"])
         for key, entry in plan.items()
         if entry["config_data"] and entry["config_data"].get("room_creation_api") == "dailybots"
     ]
     if needs_correction:
         print("\n⚠️ Detected 'dailybots' as room_creation_api in the following entries:")
-        for key in needs_correction:
+        for key, _ in needs_correction:
             print(f" - {key}")
         new_value = input("🔧 Enter replacement for 'dailybots' in room_creation_api: ").strip()
-        for key in needs_correction:
-            plan[key]["config_data"]["source_room_creation_api"] = "dailybots"
-            plan[key]["config_data"]["target_room_creation_api"] = new_value
-            plan[key]["config_data"]["room_creation_api"] = new_value
+        for _, config_data in needs_correction:
+            config_data["source_room_creation_api"] = "dailybots"
+            config_data["target_room_creation_api"] = new_value
+            config_data["room_creation_api"] = new_value
 
     print("\n📦 Transfer Plan Summary:")
-    print(json.dumps(plan, indent=2))
+    print(dumps(plan, indent=True).decode())
     return plan, skipped
 
 
 if __name__ == "__main__":
     # Step 0: Confirm if the API key is mapped to the correct source domain
-    check_api_identity("Source", DAILY_SOURCE_API_KEY)
-    check_api_identity("Target", DAILY_TARGET_API_KEY)
+    source_root, _ = check_api_identities(
+        ("Source", DAILY_SOURCE_API_KEY), ("Target", DAILY_TARGET_API_KEY)
+    )
 
     # prompt user to confirm
     confirm = input("\n📝 Do you want to proceed with the transfer? (y/n): ").strip().lower()
@@ -280,8 +265,11 @@ if __name__ == "__main__":
         print("\n❌ Transfer cancelled by user.")
         exit()
 
-    # Step 1: Fetch purchased phone numbers
-    numbers = get_purchased_phone_numbers()
+    # Step 1: Fetch purchased phone numbers, with the dial-in configs needed
+    # in step 3 fetched alongside since the two requests are independent
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        dialin_future = ex.submit(fetch_domain_dialin, DAILY_SOURCE_API_KEY)
+        numbers = get_purchased_phone_numbers()
     if numbers:
         print_numbers(numbers)
 
@@ -290,15 +278,16 @@ if __name__ == "__main__":
         # print("\n Selected numbers for transfer:")
         # print_numbers(selected_numbers)
 
-        # Step 3: Fetch configs from both endpoints for discovery
-        root_pinless_configs, root_pin_configs, dialin_configs = get_dialin_configs()
+        # Step 3: Collect configs from both endpoints for discovery
+        root_pinless_configs, root_pin_configs, dialin_configs = get_dialin_configs(
+            source_root, dialin_future.result()
+        )
         transfer_plan, skipped_numbers = build_transfer_plan(
             selected_numbers, root_pinless_configs, root_pin_configs, dialin_configs
         )
 
         # Step 4: Write transfer plan to file
-        with open("transfer_plan.json", "w") as f:
-            json.dump(transfer_plan, f, indent=2)
+        dump_file(transfer_plan, "transfer_plan.json")
         print("\n📝 transfer_plan.json has been saved.")
     else:
         print("❌ No purchased phone numbers found.")
@@ -0,0 +1,195 @@
+"""
+daily_client.py
+
+Shared Daily API client for the transfer scripts. Every request goes through one
+pooled keep-alive session so TCP/TLS connections to api.daily.co are reused
+across calls, no call can hang indefinitely, and JSON request bodies are
+serialized with fastjson. The GET helpers used by more than one script live
+here too.
+"""
+
+import atexit
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from fastjson import dumps, loads
+
+BASE_URL = "https://api.daily.co/v1"
+ROOT_URL = f"{BASE_URL}/"
+PURCHASED_URL = f"{BASE_URL}/purchased-phone-numbers"
+DIALIN_CONFIG_URL = f"{BASE_URL}/domain-dialin-config"
+
+# Seconds to wait for a connection to api.daily.co and then for each read from it
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+
+class _Session(requests.Session):
+    # Used by every call that doesn't pass its own timeout; scripts may replace it
+    timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+SESSION = _Session()
+SESSION.headers.update({"Accept-Encoding": "gzip, deflate", "Content-Type": "application/json"})
+atexit.register(SESSION.close)
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections send small requests immediately and probe idle peers."""
+
+    # urllib3's defaults already disable Nagle's algorithm (TCP_NODELAY); add TCP keep-alives.
+    # The OS default waits two hours before the first probe, so start probing after 30s idle
+    # and give up after 3 unanswered probes 10s apart, where the platform allows tuning it.
+    socket_options = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    ] + [
+        (socket.IPPROTO_TCP, getattr(socket, name), value)
+        for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if hasattr(socket, name)
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def mount_adapter(max_retries=0, pool_maxsize=32):
+    """
+    (Re)mount the pooled HTTPS adapter on the shared session with the given retry policy.
+    ``pool_maxsize`` should be at least the number of threads issuing requests, otherwise
+    connections beyond it are closed after each request instead of being kept alive.
+    """
+    # Every call goes to the same host, so a few pools with many keep-alive connections each.
+    # requests only speaks HTTP/1.1; one pooled connection per worker thread gives the same
+    # parallelism HTTP/2 multiplexing would, without adding an httpx dependency.
+    SESSION.mount(
+        "https://",
+        _KeepAliveAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=max_retries),
+    )
+
+
+# No retries unless a script opts in
+mount_adapter()
+
+
+class TokenBucket:
+    """
+    Thread-safe client-side rate limiter. Allows bursts of up to ``burst`` calls and
+    refills at ``rate`` tokens per second; acquire() only sleeps once the bucket is empty.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        """Empty the bucket, e.g. when the server reports the rate limit is used up."""
+        with self._lock:
+            self._refill()
+            self.tokens = 0
+
+
+def post_json(url, payload, **kwargs):
+    """POST ``payload`` as a JSON body through the shared session."""
+    return SESSION.post(url, data=dumps(payload), **kwargs)
+
+
+@lru_cache(maxsize=None)
+def auth_headers(token):
+    """Authorization header for ``token``, built once per key. Callers must not mutate it."""
+    # Content-Type is already set on the shared session
+    return {"Authorization": f"Bearer {token}"}
+
+
+def fetch_root(token):
+    """
+    GET the domain root for ``token``.
+
+    Returns a ``(response, data)`` tuple; ``data`` is None when the request failed.
+    """
+    response = SESSION.get(ROOT_URL, headers=auth_headers(token))
+    if response.status_code != 200:
+        return response, None
+    return response, loads(response.content)
+
+
+# fetch_root results of tokens that verified; a token's domain doesn't change mid-run
+_identities = {}
+
+
+def fetch_identity(token):
+    """
+    Like fetch_root, but once ``token`` has been verified its result is reused for the rest
+    of the run instead of being fetched again. Failed lookups are not remembered.
+    """
+    cached = _identities.get(token)
+    if cached:
+        return cached
+    response, data = fetch_root(token)
+    if data is not None:
+        _identities[token] = (response, data)
+    return response, data
+
+
+def fetch_purchased(token):
+    """GET the purchased phone numbers for ``token``; returns the raw response."""
+    return SESSION.get(PURCHASED_URL, headers=auth_headers(token))
+
+
+def fetch_domain_dialin(token):
+    """GET the domain-dialin-config entries for ``token``; returns the raw response."""
+    return SESSION.get(DIALIN_CONFIG_URL, headers=auth_headers(token))
+
+
+def report_identity(label, response, data):
+    """Print the domain behind a fetch_root result and pass its parsed root config through."""
+    if data is not None:
+        print(f"\n🔑 {label} domain: {data.get('domain_name')} (id: {data.get('domain_id')})")
+    else:
+        print(f"❌ Failed to verify {label} API token.")
+        print("Status Code:", response.status_code)
+        print("Response:", response.text)
+    return data
+
+
+def check_api_identities(*identities):
+    """
+    Verify each ``(label, token)`` pair, fetching all root configs concurrently and
+    reporting them in the order given. Returns the parsed root configs (None on failure).
+    Verified tokens are remembered by fetch_identity, so later lookups cost no request.
+    """
+    with ThreadPoolExecutor(max_workers=len(identities)) as ex:
+        fetched = list(ex.map(fetch_identity, [token for _, token in identities]))
+    return [
+        report_identity(label, response, data)
+        for (label, _), (response, data) in zip(identities, fetched)
+    ]
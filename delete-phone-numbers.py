@@ -12,9 +12,17 @@ Usage:
 
 import sys
 import requests
-import json
 import argparse
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from daily_client import BASE_URL, PURCHASED_URL, ROOT_URL, SESSION, auth_headers
+from fastjson import dumps, loads
+
+RELEASE_URL = f"{BASE_URL}/release-phone-number"
+
+# Upper bound on release requests in flight at once, kept low to stay under API rate limits
+MAX_CONCURRENT_RELEASES = 8
 
 def make_api_request(method: str, url: str, headers: Dict[str, str], data: Any = None, exit_on_error: bool = True) -> requests.Response:
     """
@@ -35,9 +43,10 @@ def make_api_request(method: str, url: str, headers: Dict[str, str], data: Any =
     """
     try:
         if method == "GET":
-            response = requests.get(url, headers=headers)
+            response = SESSION.get(url, headers=headers)
         elif method == "DELETE":
-            response = requests.delete(url, headers=headers, json=data)
+            body = dumps(data) if data is not None else None
+            response = SESSION.delete(url, headers=headers, data=body)
         else:
             raise ValueError(f"Unsupported method: {method}")
         
@@ -60,14 +69,11 @@ def get_domain_info(api_key: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing domain information including domain_name and created_at
     """
-    url = "https://api.daily.co/v1/"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    url = ROOT_URL
+    headers = auth_headers(api_key)
     
     response = make_api_request("GET", url, headers)
-    return response.json()
+    return loads(response.content)
 
 def list_phone_numbers(api_key: str) -> List[Dict[str, Any]]:
     """
@@ -85,14 +91,11 @@ def list_phone_numbers(api_key: str) -> List[Dict[str, Any]]:
         - created_at: Creation timestamp
         - deleted: Boolean indicating if number is already deleted
     """
-    url = "https://api.daily.co/v1/purchased-phone-numbers"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    url = PURCHASED_URL
+    headers = auth_headers(api_key)
     
     response = make_api_request("GET", url, headers)
-    data = response.json()
+    data = loads(response.content)
     return data.get("data", [])
 
 def release_phone_number(api_key: str, phone_id: str) -> None:
@@ -106,15 +109,29 @@ def release_phone_number(api_key: str, phone_id: str) -> None:
     Raises:
         RequestException: If the release operation fails
     """
-    url = f"https://api.daily.co/v1/release-phone-number/{phone_id}"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    url = f"{RELEASE_URL}/{phone_id}"
+    headers = auth_headers(api_key)
     
     # Don't exit on error - let caller handle individual failures
     make_api_request("DELETE", url, headers, exit_on_error=False)
 
+def _release(api_key: str, phone: Dict[str, Any]) -> Tuple[Dict[str, Any], bool, Optional[Exception]]:
+    """
+    Release a phone number, capturing any failure instead of raising.
+    
+    Args:
+        api_key: Daily API key for authentication
+        phone: Phone number object as returned by list_phone_numbers
+        
+    Returns:
+        Tuple of (phone, ok, error) where error is None on success
+    """
+    try:
+        release_phone_number(api_key, phone['id'])
+        return phone, True, None
+    except Exception as e:
+        return phone, False, e
+
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Delete Daily.co phone numbers")
@@ -188,26 +205,34 @@ def main():
     success_count = 0
     failed_count = 0
     
+    releasable = []
     for phone in active_phone_numbers:
-        phone_id = phone.get('id')
-        phone_number = phone.get('number') or phone.get('phone_number')
-        
         # Skip if no ID found (shouldn't happen, but be safe)
-        if not phone_id:
-            print(f"Skipping {phone_number} - no ID found")
+        if not phone.get('id'):
+            print(f"Skipping {phone.get('number') or phone.get('phone_number')} - no ID found")
             failed_count += 1
             continue
+        releasable.append(phone)
+    
+    # The pool only starts threads once something is submitted to it
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_RELEASES) as ex:
+        if len(releasable) <= 1:
+            # Not worth handing a single release to a worker thread
+            results = (_release(api_key, phone) for phone in releasable)
+        else:
+            # Releases are independent, so issue them concurrently
+            results = ex.map(lambda phone: _release(api_key, phone), releasable)
         
-        try:
-            # Attempt to release the phone number
-            print(f"Releasing {phone_id} {phone_number}...", end="")
-            release_phone_number(api_key, phone_id)
-            print(" SUCCESS")
-            success_count += 1
-        except Exception as e:
-            # Log failure but continue with other numbers
-            print(f" FAILED: {e}")
-            failed_count += 1
+        # Releases can't be undone, so report each one as soon as its result is in
+        for phone, ok, error in results:
+            phone_number = phone.get('number') or phone.get('phone_number')
+            if ok:
+                print(f"Releasing {phone['id']} {phone_number}... SUCCESS", flush=True)
+                success_count += 1
+            else:
+                # Log failure but continue with other numbers
+                print(f"Releasing {phone['id']} {phone_number}... FAILED: {error}", flush=True)
+                failed_count += 1
     
     # Step 6: Display summary
     print("\n" + "=" * 50)
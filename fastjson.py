@@ -0,0 +1,67 @@
+"""
+fastjson.py
+
+JSON helpers shared by the transfer scripts. Uses orjson when it is installed,
+then ujson, and falls back to the standard library json module otherwise.
+"""
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is None:
+    try:
+        import ujson
+    except ImportError:
+        ujson = None
+        import json
+
+
+if orjson is not None:
+
+    def loads(data):
+        """Parse JSON from bytes or str."""
+        return orjson.loads(data)
+
+    def dumps(obj, indent=False):
+        """Serialize obj to UTF-8 encoded JSON bytes, optionally indented by 2 spaces."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+elif ujson is not None:
+
+    def loads(data):
+        """Parse JSON from bytes or str."""
+        return ujson.loads(data)
+
+    def dumps(obj, indent=False):
+        """Serialize obj to UTF-8 encoded JSON bytes, optionally indented by 2 spaces."""
+        return ujson.dumps(
+            obj, indent=2 if indent else 0, ensure_ascii=False, escape_forward_slashes=False
+        ).encode()
+
+else:
+    # json.dumps builds a new encoder for every call with non-default options; reuse two
+    _compact_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    _indent_encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+    def loads(data):
+        """Parse JSON from bytes or str."""
+        return json.loads(data)
+
+    def dumps(obj, indent=False):
+        """Serialize obj to UTF-8 encoded JSON bytes, optionally indented by 2 spaces."""
+        encoder = _indent_encoder if indent else _compact_encoder
+        return encoder.encode(obj).encode()
+
+
+def load_file(path):
+    """Read and parse a JSON file."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(obj, path):
+    """Write obj to path as indented JSON."""
+    with open(path, "wb") as f:
+        f.write(dumps(obj, indent=True))
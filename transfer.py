@@ -1,112 +1,289 @@
-import json as json_module
-import json
+import argparse
+import math
 import os
-import time
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, fields
 
 import requests
 from dotenv import load_dotenv
+from urllib3.util import Retry
+
+from daily_client import (
+    BASE_URL,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    SESSION,
+    TokenBucket,
+    auth_headers,
+    check_api_identities,
+    fetch_identity,
+    mount_adapter,
+    post_json,
+)
+from fastjson import dumps, load_file, loads
 
 load_dotenv(override=True)
 
-success_log = []
-failure_log = []
-
 DAILY_SOURCE_API_KEY = os.getenv("DAILY_SOURCE_API_KEY")
 DAILY_TARGET_API_KEY = os.getenv("DAILY_TARGET_API_KEY")
-BASE_URL = "https://api.daily.co/v1"
 
-# Retry configuration for rate limit handling
-MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
-INITIAL_DELAY = int(os.getenv("INITIAL_DELAY", "1"))
-BACKOFF_FACTOR = int(os.getenv("BACKOFF_FACTOR", "2"))
-TRANSFER_DELAY = int(os.getenv("TRANSFER_DELAY", "2"))
+# Status codes worth retrying: rate limits (which the API sometimes reports as 400) and gateway
+# errors. POSTs are only retried on a subset of these, see BackoffRetry
+RETRY_ON_CODES = [400, 429, 500, 502, 503, 504]
+
+
+@dataclass(frozen=True)
+class Cfg:
+    """
+    Tuning settings for transfer.py. Each field can be overridden by the environment
+    variable of the same name in upper case (see env.example); values are checked once,
+    at startup.
+    """
+
+    # Retries on rate limits, gateway errors and timeouts: INITIAL_DELAY * BACKOFF_FACTOR ** n.
+    # POSTs are not retried after a read timeout; that is reported as a request error that
+    # may still have been applied (see BackoffRetry)
+    max_retries: int = 3
+    initial_delay: float = 1.0
+    backoff_factor: float = 2.0
+    # Client-side pacing: sustained requests per second, and how many may go out back to back
+    rate_limit: float = 10.0
+    rate_limit_burst: int = 10
+    # Seconds to wait for a connection and for each read
+    connect_timeout: float = CONNECT_TIMEOUT
+    read_timeout: float = READ_TIMEOUT
+    # Number of plan entries transferred at once; 1 processes them one by one
+    transfer_concurrency: int = 8
+    # What to do with a transferred number whose config can't be created in the target domain:
+    # "always" moves it back, "never" leaves it, "ask" prompts (only when running one at a time)
+    rollback_policy: str = "ask"
+
+    def __post_init__(self):
+        # nan and inf parse as floats but slip past every comparison below
+        for field in fields(self):
+            if field.type is float and not math.isfinite(getattr(self, field.name)):
+                raise ValueError(f"❌ {field.name.upper()} must be a finite number.")
+        if self.max_retries < 0 or self.initial_delay < 0:
+            raise ValueError("❌ MAX_RETRIES and INITIAL_DELAY must not be negative.")
+        if self.backoff_factor < 1:
+            raise ValueError("❌ BACKOFF_FACTOR must be at least 1.")
+        if self.rate_limit <= 0 or self.rate_limit_burst < 1:
+            raise ValueError("❌ RATE_LIMIT must be positive and RATE_LIMIT_BURST at least 1.")
+        if self.connect_timeout <= 0 or self.read_timeout <= 0:
+            raise ValueError("❌ CONNECT_TIMEOUT and READ_TIMEOUT must be positive.")
+        if self.transfer_concurrency < 1:
+            raise ValueError("❌ TRANSFER_CONCURRENCY must be at least 1.")
+        if self.rollback_policy not in ("always", "never", "ask"):
+            raise ValueError(
+                f"❌ ROLLBACK_POLICY must be always, never or ask (got {self.rollback_policy!r})."
+            )
+
+    @classmethod
+    def from_env(cls):
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(field.name.upper())
+            if raw is None:
+                continue
+            try:
+                values[field.name] = field.type(raw.strip().lower())
+            except ValueError:
+                expected = "a whole number" if field.type is int else "a number"
+                raise ValueError(
+                    f"❌ {field.name.upper()} must be {expected} (got {raw!r})."
+                    " Check your .env file."
+                ) from None
+        return cls(**values)
+
+    @property
+    def request_timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    @property
+    def concurrent(self):
+        return self.transfer_concurrency > 1
+
+
+CFG = Cfg.from_env()
 
 if not DAILY_SOURCE_API_KEY or not DAILY_TARGET_API_KEY:
     raise ValueError(
         "❌ DAILY_SOURCE_API_KEY or DAILY_TARGET_API_KEY is not set. Check your .env file."
     )
 
+# Built once per key and shared by every request (Content-Type is set on the session)
+HEADERS_BY_KEY = {key: auth_headers(key) for key in (DAILY_SOURCE_API_KEY, DAILY_TARGET_API_KEY)}
 
-def make_api_request(method, url, headers=None, json_data=None, retry_on_codes=None):
+
+class TransferLog:
+    """
+    Thread-safe log of transfer events. While open, every entry is appended to a JSON
+    Lines file and synced to disk as it is recorded, so progress survives a crash and
+    carries over between runs. Entries are not kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        self._file = open(self.path, "a+b")
+        # A run that died mid-write can leave a partial last line; don't append onto it
+        if self._file.seek(0, os.SEEK_END):
+            self._file.seek(-1, os.SEEK_END)
+            if self._file.read(1) != b"\n":
+                self._file.write(b"\n")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def append(self, identifier, event, **details):
+        entry = {"id": identifier, "event": event, **details}
+        line = dumps(entry) + b"\n"
+        with self._lock:
+            if self._file:
+                self._file.write(line)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def progress(self):
+        """Events from this and previous runs of the script, as ``{id: [entry, ...]}``."""
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return {}
+        progress = {}
+        for line in lines:
+            try:
+                entry = loads(line)
+            except ValueError:
+                continue  # partial line left by an interrupted run
+            progress.setdefault(entry.get("id"), []).append(entry)
+        return progress
+
+
+def entry_ref(entry, source_domain):
     """
-    Make an API request with automatic retry on failure.
+    What a plan entry's log events are tagged with, so a later plan for the same number
+    or SIP URI (e.g. after moving it back) isn't mistaken for work already done.
+    """
+    return {
+        "source": source_domain,
+        "source_phone_id": entry["source_phone_id"],
+        "config_id": entry["config_id"],
+    }
+
+
+success_log = TransferLog("transfer_success.jsonl")
+failure_log = TransferLog("transfer_failures.jsonl")
+
+
+class BackoffRetry(Retry):
+    """
+    urllib3 retry policy that waits initial_delay * backoff_factor ** n seconds plus up to
+    a second of random jitter between attempts. A Retry-After header sent by the server
+    takes precedence over the computed delay.
+
+    POSTs are not retried after a read error (e.g. a read timeout) or a 5xx/400 response:
+    the server may already have applied them, and sending a transfer or create again would
+    fail or duplicate it. They are only retried when the request was plainly refused, i.e.
+    on 429, or on 503 with a Retry-After header.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == "POST":
+            return status_code == 429 or (status_code == 503 and has_retry_after)
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        if error is not None and method == "POST" and self._is_read_error(error):
+            raise error
+        return super().increment(method, url, response, error, *args, **kwargs)
+
+    def get_backoff_time(self):
+        if not self.history:
+            return 0
+        delay = CFG.initial_delay * CFG.backoff_factor ** (len(self.history) - 1)
+        return delay + random.uniform(0, 1)
+
+    def sleep(self, response=None):
+        print(f"⏳ Request failed, retrying... (attempt {len(self.history)}/{CFG.max_retries})")
+        super().sleep(response)
+
+
+mount_adapter(
+    BackoffRetry(
+        # Connect and read errors, timeouts included, count against the same budget
+        # (read errors and 5xx/400 only for GET and DELETE, see BackoffRetry)
+        total=CFG.max_retries,
+        status_forcelist=RETRY_ON_CODES,
+        allowed_methods=["GET", "POST", "DELETE"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+    # One keep-alive connection per worker, so concurrent entries never wait on or discard one
+    pool_maxsize=max(32, CFG.transfer_concurrency),
+)
+
+
+# Every request from this script, the startup identity checks included, uses these timeouts
+SESSION.timeout = CFG.request_timeout
+
+rate_limiter = TokenBucket(CFG.rate_limit, CFG.rate_limit_burst)
+
+
+def make_api_request(method, url, headers=None, json_data=None):
+    """
+    Make an API request through the shared session, paced by rate_limiter. Retries on
+    RETRY_ON_CODES, connection errors and timeouts (CFG.request_timeout) are handled by the
+    session's adapter (see BackoffRetry).
     
     Args:
         method: HTTP method ('GET', 'POST', 'DELETE')
         url: Full URL to call
         headers: Request headers
         json_data: JSON payload for POST requests
-        retry_on_codes: List of status codes that should trigger a retry (default: [400, 429])
     
     Returns:
-        requests.Response object
+        requests.Response object for the final attempt
     """
-    retry_on_codes = retry_on_codes or [400, 429]
-    
-    def _make_request():
-        if method.upper() == 'GET':
-            response = requests.get(url, headers=headers)
-        elif method.upper() == 'POST':
-            response = requests.post(url, headers=headers, json=json_data)
-        elif method.upper() == 'DELETE':
-            response = requests.delete(url, headers=headers)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
-        
-        if response.status_code in retry_on_codes:
-            raise Exception(f"HTTP {response.status_code} error (possibly rate limit): {response.text}")
-        
-        return response
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            return _make_request()
-        except Exception as e:
-            if attempt == MAX_RETRIES - 1:
-                # Return a mock response for the last failed attempt
-                class MockResponse:
-                    def __init__(self, status_code, text):
-                        self.status_code = status_code
-                        self.text = text
-                    def json(self):
-                        try:
-                            return json_module.loads(self.text)
-                        except:
-                            return {"error": self.text}
-                return MockResponse(retry_on_codes[0], str(e))
-            
-            delay = INITIAL_DELAY * (BACKOFF_FACTOR ** attempt)
-            print(f"⏳ Request failed, retrying in {delay} seconds... (attempt {attempt + 1}/{MAX_RETRIES})")
-            time.sleep(delay)
+    rate_limiter.acquire()
+    if method.upper() == 'GET':
+        response = SESSION.get(url, headers=headers)
+    elif method.upper() == 'POST':
+        response = post_json(url, json_data, headers=headers)
+    elif method.upper() == 'DELETE':
+        response = SESSION.delete(url, headers=headers)
+    else:
+        raise ValueError(f"Unsupported HTTP method: {method}")
 
+    # Hold off everyone else once the API says the quota is spent
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        rate_limiter.drain()
+    return response
 
+
+# Answered from the identity check at startup rather than a GET / per transfer
 def get_domain_name(api_key):
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = make_api_request("GET", f"{BASE_URL}/", headers=headers)
-    if response.status_code == 200:
-        return response.json().get("domain_name")
+    _, data = fetch_identity(api_key)
+    if data is not None:
+        return data.get("domain_name")
     raise ValueError("❌ Unable to retrieve domain name from API key.")
 
 
-def check_api_identity(label, token):
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    response = make_api_request("GET", f"{BASE_URL}/", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"\n🔑 {label} domain: {data.get('domain_name')} (id: {data.get('domain_id')})")
-    else:
-        print(f"❌ Failed to verify {label} API token.")
-        print("Status Code:", response.status_code)
-        print("Response:", response.text)
-
-
 def create_dialin_config(api_key, config_data):
     url = f"{BASE_URL}/domain-dialin-config"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    headers = HEADERS_BY_KEY[api_key]
     response = make_api_request("POST", url, headers=headers, json_data=config_data)
     
     if response.status_code in (200, 201):
-        return response.json()
+        return loads(response.content)
     else:
         print(f"❌ Failed to create dialin config: {response.text}")
         return None
@@ -114,22 +291,19 @@ def create_dialin_config(api_key, config_data):
 
 def delete_dialin_config(api_key, config_id):
     url = f"{BASE_URL}/domain-dialin-config/{config_id}"
-    headers = {"Authorization": f"Bearer {api_key}"}
+    headers = HEADERS_BY_KEY[api_key]
     response = make_api_request("DELETE", url, headers=headers)
     
     if response.status_code in (200, 204):
-        success_log.append(config_id + " [config deleted]")
+        success_log.append(config_id, "config deleted")
         print(f"✅ Deleted dialin config ID: {config_id}")
     else:
-        failure_log.append(config_id + " [config deletion failed]")
+        failure_log.append(config_id, "config deletion failed")
         print(f"⚠️ Failed to delete dialin config ID {config_id}: {response.text}")
 
 
 def request_phone_number_transfer(phone_id, from_api_key, to_api_key):
-    headers = {
-        "Authorization": f"Bearer {from_api_key}",
-        "Content-Type": "application/json",
-    }
+    headers = HEADERS_BY_KEY[from_api_key]
     url = f"{BASE_URL}/transfer-phone-number/{phone_id}"
     payload = {
         "transferDomainName": get_domain_name(to_api_key),
@@ -138,16 +312,83 @@ def request_phone_number_transfer(phone_id, from_api_key, to_api_key):
     return make_api_request("POST", url, headers=headers, json_data=payload)
 
 
-def transfer_number_and_config(identifier, entry, source_api_key, target_api_key):
+# Plan-only keys that are not part of the dial-in config sent to the API
+EXCLUDED_CONFIG_KEYS = frozenset(("sip_uri", "target_room_creation_api", "source_room_creation_api"))
+
+
+def _prepare_configs(config_data):
+    """
+    Build the config payloads from a plan entry's config_data in one pass.
+
+    Returns ``(new_config_data, restore_config_data)``: the config to create in the target
+    domain and the one to restore in the source domain on rollback. A timeout_config that
+    isn't an object is dropped, since the API would reject it.
+
+    Both payloads share config_data's nested values (e.g. timeout_config) rather than copying
+    them, so neither the payloads nor the plan entry may be mutated in place.
+    """
+    base = {k: v for k, v in config_data.items() if k not in EXCLUDED_CONFIG_KEYS}
+    if not isinstance(base.get("timeout_config", {}), dict):
+        del base["timeout_config"]
+    room_creation_api = config_data.get("room_creation_api")
+    new_config_data = {
+        **base,
+        "room_creation_api": config_data.get("target_room_creation_api") or room_creation_api,
+    }
+    restore_config_data = {
+        **base,
+        "room_creation_api": config_data.get("source_room_creation_api") or room_creation_api,
+    }
+    return new_config_data, restore_config_data
+
+
+def find_invalid_entries(transfer_plan):
+    """
+    Check every plan entry's config before anything is transferred.
+
+    Returns the identifiers of entries whose config can't be created in the target domain.
+    """
+    invalid = []
+    for identifier, entry in transfer_plan.items():
+        config_data = entry.get("config_data")
+        if not config_data:
+            continue
+        if not isinstance(config_data.get("timeout_config", {}), dict):
+            print(f"⚠️ Invalid timeout_config format for {identifier}. It will be removed.")
+        if not _prepare_configs(config_data)[0].get("room_creation_api"):
+            print(f"❌ Missing room_creation_api for {identifier}.")
+            invalid.append(identifier)
+    return invalid
+
+
+def transfer_number_and_config(
+    identifier, entry, source_api_key, target_api_key, done=(), new_phone_id=None
+):
+    """
+    Run steps a-c for one plan entry. ``done`` names the steps ("transfer successful",
+    "config deleted") an earlier run already completed, which are skipped; when the
+    transfer is among them, ``new_phone_id`` is the ID the number got in the target domain.
+    """
     phone_id = entry["source_phone_id"]
     src_type = entry["src_type"]
     config_id = entry["config_id"]
     config_data = entry["config_data"]
-    new_phone_id = None  # Track the new phone ID for potential rollback
+    ref = entry_ref(entry, get_domain_name(source_api_key))
+
+    # Validate before the number is moved, so a bad config can't strand it
+    if config_data:
+        new_config_data, restore_config_data = _prepare_configs(config_data)
+        if not new_config_data.get("room_creation_api"):
+            print(f"❌ Missing room_creation_api for {identifier}. Skipping.")
+            failure_log.append(identifier, "missing room_creation_api")
+            return False
 
     if not phone_id:
         print(f"ℹ️ No phone number ID for {identifier}, skipping transfer step.")
         phone_transfer_skipped = True
+    elif "transfer successful" in done:
+        print(f"ℹ️ {identifier} was already transferred (new ID: {new_phone_id}).")
+        phone_transfer_skipped = True
     else:
         phone_transfer_skipped = False
 
@@ -155,83 +396,76 @@ def transfer_number_and_config(identifier, entry, source_api_key, target_api_key
     if not phone_transfer_skipped:
         move_resp = request_phone_number_transfer(phone_id, source_api_key, target_api_key)
         if move_resp.status_code not in (200, 201):
-            failure_log.append(identifier + " [transfer failed]")
+            failure_log.append(identifier, "transfer failed")
             print(f"❌ Failed to transfer {identifier}: {move_resp.text}")
             return False
         else:
             # Extract the new phone ID from the response
-            move_data = move_resp.json()
+            move_data = loads(move_resp.content)
             new_phone_id = move_data.get("newId")
-            success_log.append(identifier + " [transfer successful]")
+            success_log.append(
+                identifier, "transfer successful", new_phone_id=new_phone_id, **ref
+            )
             print(f"✅ Transferred number {identifier} to target domain (new ID: {new_phone_id})")
 
-    # Step b: Delete config in source domain
-    if src_type == "domain-dialin-config" and config_id:
+    # Step b: Delete config in source domain. This can't overlap with step c: the API
+    # rejects a config in the target domain until the source one is gone. Latency is
+    # hidden by running several entries at once instead (TRANSFER_CONCURRENCY).
+    if src_type == "domain-dialin-config" and config_id and "config deleted" not in done:
         delete_dialin_config(source_api_key, config_id)
 
     # Step c: Copy config to target domain
     if config_data:
-        new_config_data = config_data.copy()
-        restore_config_data = config_data.copy()
-        # Remove keys that are not part of the config
-        for key in ["sip_uri", "target_room_creation_api", "source_room_creation_api"]:
-            new_config_data.pop(key, None)
-            restore_config_data.pop(key, None)
-
-        new_config_data["room_creation_api"] = config_data.get(
-            "target_room_creation_api"
-        ) or config_data.get("room_creation_api")
-
-        restore_config_data["room_creation_api"] = config_data.get(
-            "source_room_creation_api"
-        ) or config_data.get("room_creation_api")
-
-        # Validate required field
-        if not new_config_data.get("room_creation_api"):
-            print(f"❌ Missing room_creation_api for {identifier}. Skipping.")
-            failure_log.append(identifier + " [missing room_creation_api]")
-            return False
-
-        # Validate nested objects
-        if "timeout_config" in new_config_data and not isinstance(
-            new_config_data["timeout_config"], dict
-        ):
-            print(f"⚠️ Invalid timeout_config format for {identifier}. Removing.")
-            new_config_data.pop("timeout_config")
-
         create_resp = create_dialin_config(target_api_key, new_config_data)
         if not create_resp:
-            failure_log.append(identifier + " [config failed]")
+            failure_log.append(identifier, "config failed")
             print(f"❌ Failed to create config for {identifier}")
-            rollback = input("🔁 Rollback transfer? (y/n): ").strip().lower()
-            if rollback == "y" and new_phone_id:
+            # A prompt would stall every other worker, so "ask" only prompts when sequential
+            rollback = CFG.rollback_policy == "always" or (
+                CFG.rollback_policy == "ask"
+                and not CFG.concurrent
+                and input(f"🔁 Rollback transfer of {identifier}? (y/n): ").strip().lower() == "y"
+            )
+            if CFG.rollback_policy == "ask" and CFG.concurrent and new_phone_id:
+                print(
+                    f"ℹ️ Leaving {identifier} in the target domain: ROLLBACK_POLICY=ask only"
+                    " prompts when TRANSFER_CONCURRENCY=1."
+                )
+            if rollback and new_phone_id:
                 # Rollback: move number back using the NEW phone ID
                 rollback_resp = request_phone_number_transfer(
                     new_phone_id, target_api_key, source_api_key
                 )
                 if rollback_resp.status_code in (200, 201):
-                    success_log.append(identifier + " [rollback successful]")
+                    success_log.append(identifier, "rollback successful", **ref)
                     print(f"✅ Rolled back number {identifier} to source domain")
                 else:
-                    failure_log.append(identifier + " [rollback failed]")
+                    failure_log.append(identifier, "rollback failed")
                     print(
                         f"❌ Failed to rollback {identifier}. Status: {rollback_resp.status_code}"
                     )
                     print("Response:", rollback_resp.text)
                 if rollback_resp.status_code in (200, 201) and config_id:
                     create_dialin_config(source_api_key, restore_config_data)
-                    success_log.append(identifier + " [config restored]")
+                    success_log.append(identifier, "config restored", **ref)
                     print(f"✅ Restored config for {identifier} in source domain")
             return False
-        success_log.append(identifier + " [config created]")
+        success_log.append(identifier, "config created", **ref)
 
     return True
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transfer Daily phone numbers and dial-in configs")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Skip plan entries that fail validation instead of aborting the whole transfer",
+    )
+    args = parser.parse_args()
+
     # Step 0: Confirm if the API key is mapped to the correct source domain
-    check_api_identity("Source", DAILY_SOURCE_API_KEY)
-    check_api_identity("Target", DAILY_TARGET_API_KEY)
+    check_api_identities(("Source", DAILY_SOURCE_API_KEY), ("Target", DAILY_TARGET_API_KEY))
 
     # prompt user to confirm
     confirm = input("\n📝 Do you want to proceed with the transfer? (y/n): ").strip().lower()
@@ -241,8 +475,7 @@ if __name__ == "__main__":
 
     # Step 1: Load and verify transfer_plan.json
     try:
-        with open("transfer_plan.json") as f:
-            transfer_plan = json.load(f)
+        transfer_plan = load_file("transfer_plan.json")
     except Exception as e:
         print(f"❌ Failed to load transfer_plan.json: {e}")
         exit()
@@ -251,25 +484,109 @@ if __name__ == "__main__":
         print("❌ transfer_plan.json is empty. Nothing to transfer.")
         exit()
 
-    # Step 2: Process each entry in the plan
-    for idx, (identifier, entry) in enumerate(transfer_plan.items()):
-        print(f"\n📞 Processing {identifier}...")
-        success = transfer_number_and_config(
-            identifier, entry, DAILY_SOURCE_API_KEY, DAILY_TARGET_API_KEY
+    # Nothing has been changed yet; refuse a plan that would fail partway through
+    invalid = find_invalid_entries(transfer_plan)
+    if invalid:
+        if not args.force:
+            print(
+                f"\n❌ {len(invalid)} entries in transfer_plan.json are invalid. Fix them, or run"
+                " with --force to skip them."
+            )
+            exit(1)
+        print(f"\n⚠️ Skipping {len(invalid)} invalid entries (--force).")
+        for identifier in invalid:
+            del transfer_plan[identifier]
+        if not transfer_plan:
+            print("❌ No valid entries left in transfer_plan.json. Nothing to transfer.")
+            exit()
+
+    # Fail fast if either key didn't verify; otherwise this is already cached
+    source_domain = get_domain_name(DAILY_SOURCE_API_KEY)
+    get_domain_name(DAILY_TARGET_API_KEY)
+
+    # Pick up where earlier runs stopped. Finished entries are skipped, and entries that
+    # failed partway resume after the steps they already completed. Entries that were
+    # rolled back now have new IDs in the source domain, so they need a fresh plan.
+    # Only events logged for this same entry (source domain and IDs) count.
+    progress = success_log.progress()
+    remaining = {}
+    completed = []
+    rolled_back = []
+    for identifier, entry in transfer_plan.items():
+        ref = entry_ref(entry, source_domain).items()
+        events = {
+            logged["event"]: logged
+            for logged in progress.get(identifier, ())
+            if all(logged.get(key) == value for key, value in ref)
+        }
+        if "completed" in events or "config created" in events:
+            completed.append(identifier)
+        elif "rollback successful" in events or "config restored" in events:
+            rolled_back.append(identifier)
+        else:
+            done = set(events) & {"transfer successful"}
+            deletions = progress.get(entry["config_id"], ())
+            if any(logged["event"] == "config deleted" for logged in deletions):
+                done.add("config deleted")
+            new_phone_id = events.get("transfer successful", {}).get("new_phone_id")
+            remaining[identifier] = (entry, done, new_phone_id)
+    if completed:
+        print(
+            f"\n⏭️ Skipping {len(completed)} entries already completed"
+            " (see transfer_success.jsonl)."
         )
-        if not success:
-            print(f"⚠️ Skipping {identifier} due to failure.")
-        
-        # Add a small delay between transfers to avoid rate limits
-        if idx < len(transfer_plan) - 1:
-            print(f"⏳ Waiting {TRANSFER_DELAY} seconds before next transfer...")
-            time.sleep(TRANSFER_DELAY)
-
-    with open("transfer_success.json", "w") as f:
-        json.dump(success_log, f, indent=2)
-
-    with open("transfer_failures.json", "w") as f:
-        json.dump(failure_log, f, indent=2)
+    if rolled_back:
+        print(
+            f"\n⚠️ Skipping {len(rolled_back)} entries rolled back by an earlier run:"
+            f" {', '.join(rolled_back)}. Their number and config are back in the source"
+            " domain with new IDs; run create-transfer-plan.py again to transfer them."
+        )
+    if not remaining:
+        print("✅ Nothing left to transfer in transfer_plan.json.")
+        exit()
 
-    print(f"\n✅ {len(success_log)} transfers succeeded.")
-    print(f"❌ {len(failure_log)} transfers failed.")
+    def process_entry(identifier, entry, done, new_phone_id):
+        print(f"\n📞 Processing {identifier}...")
+        try:
+            success = transfer_number_and_config(
+                identifier,
+                entry,
+                DAILY_SOURCE_API_KEY,
+                DAILY_TARGET_API_KEY,
+                done=done,
+                new_phone_id=new_phone_id,
+            )
+        except requests.RequestException as e:
+            # Retries are exhausted by the time this is raised; keep going with the other entries
+            failure_log.append(identifier, "request error")
+            print(f"❌ Request error while processing {identifier}: {e}")
+            if isinstance(e, requests.Timeout):
+                print(f"⚠️ The timed-out request for {identifier} may still have been applied.")
+            success = False
+        if success:
+            # Marks the whole entry as done so a re-run skips it
+            success_log.append(identifier, "completed", **entry_ref(entry, source_domain))
+        else:
+            print(f"⚠️ Skipping {identifier} due to failure.")
+        return success
+
+    # Step 2: Process each entry in the plan. Entries touch different phone numbers
+    # and configs, so they can run side by side; only a couple of entries per worker
+    # are queued at any time.
+    success_log.open()
+    failure_log.open()
+    results = []
+    with ThreadPoolExecutor(max_workers=CFG.transfer_concurrency) as ex:
+        pending = set()
+        for identifier, resume in remaining.items():
+            if len(pending) >= CFG.transfer_concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+            pending.add(ex.submit(process_entry, identifier, *resume))
+        results.extend(future.result() for future in as_completed(pending))
+
+    success_log.close()
+    failure_log.close()
+
+    print(f"\n✅ {results.count(True)} transfers succeeded.")
+    print(f"❌ {results.count(False)} transfers failed.")